@@ -4,9 +4,18 @@
 # Description: Directed Graphs
 
 import heapq
+import sys
+from array import array
 from collections import deque
 
 
+def _fits_compact(weight) -> bool:
+    """
+    Returns True if weight can be stored in an array('I') row
+    """
+    return isinstance(weight, int) and not isinstance(weight, bool) and 0 <= weight <= 0xFFFFFFFF
+
+
 class DirectedGraph:
     """
     Class to implement directed weighted graph
@@ -16,6 +25,15 @@ class DirectedGraph:
     - vertex names are integers
     """
 
+    # shortest path trees kept current by add_vertex / add_edge / remove_edge
+    shortest_path_trees = None
+
+    # optional graph_journal.GraphJournal recording every mutation
+    journal = None
+
+    # array typecode of the matrix rows once compact() is called
+    weight_typecode = None
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency matrix
@@ -58,6 +76,10 @@ class DirectedGraph:
         """
         Adds a vertex to the matrix
         """
+        # logs the change before making it
+        if self.journal is not None:
+            self.journal.record('add_vertex')
+
         #initializes
         length = self.v_count
 
@@ -65,12 +87,20 @@ class DirectedGraph:
         self.v_count += 1
 
         # adds 0s to the new row
-        self.adj_matrix.append([0] * self.v_count)
+        if self.weight_typecode is None:
+            self.adj_matrix.append([0] * self.v_count)
+        else:
+            self.adj_matrix.append(array(self.weight_typecode, [0]) * self.v_count)
         # adds 0s to the previous rows
         for index in range(length):
             self.adj_matrix[(length - 1)].append(0 * (self.v_count - length))
             length -= 1
 
+        # grows registered shortest path trees
+        if self.shortest_path_trees:
+            for tree in self.shortest_path_trees:
+                tree.vertex_added()
+
         return self.v_count
 
     def add_edge(self, src: int, dst: int, weight=1) -> None:
@@ -81,10 +111,24 @@ class DirectedGraph:
         if 0 <= src < self.v_count and \
                 0 <= dst < self.v_count and \
                 weight > 0 and \
-                src is not dst:
+                src != dst:
+            # compact rows only hold 32-bit unsigned integer weights
+            if self.weight_typecode is not None and not _fits_compact(weight):
+                raise ValueError(f'compact graph needs integer weights below 2**32, got {weight!r}')
+
+            # logs the change before making it
+            if self.journal is not None:
+                self.journal.record('add_edge', src, dst, weight)
+
             # add weight to create edge
+            old_weight = self.adj_matrix[src][dst]
             self.adj_matrix[src][dst] = weight
 
+            # repairs registered shortest path trees
+            if self.shortest_path_trees:
+                for tree in self.shortest_path_trees:
+                    tree.edge_updated(src, dst, old_weight, weight)
+
     def remove_edge(self, src: int, dst: int) -> None:
         """
         Removes and edge from the graph
@@ -93,9 +137,19 @@ class DirectedGraph:
         if 0 <= src < self.v_count and \
                 0 <= dst < self.v_count and \
                 self.adj_matrix[src][dst] > 0:
+            # logs the change before making it
+            if self.journal is not None:
+                self.journal.record('remove_edge', src, dst)
+
             # sets edge weight equal to 0
+            old_weight = self.adj_matrix[src][dst]
             self.adj_matrix[src][dst] = 0
 
+            # repairs registered shortest path trees
+            if self.shortest_path_trees:
+                for tree in self.shortest_path_trees:
+                    tree.edge_updated(src, dst, old_weight, 0)
+
     def get_vertices(self) -> []:
         """
         Returns a list of all vertices
@@ -276,11 +330,382 @@ class DirectedGraph:
         # returns false if cycle not found
         return False
 
+    def compact(self) -> None:
+        """
+        Stores each matrix row as an array('I') instead of a list of ints
+        Weights must be integers below 2**32, now and in later add_edge calls
+        """
+        # checks every weight before converting any row
+        for row in self.adj_matrix:
+            for weight in row:
+                if not _fits_compact(weight):
+                    raise ValueError(f'compact graph needs integer weights below 2**32, got {weight!r}')
+
+        self.weight_typecode = 'I'
+        for index in range(self.v_count):
+            self.adj_matrix[index] = array('I', self.adj_matrix[index])
+
+    def memory_footprint(self) -> dict:
+        """
+        Returns approximate bytes used by each part of the graph
+        """
+        footprint = {'matrix': sys.getsizeof(self.adj_matrix), 'rows': 0,
+                     'weights': 0, 'shortest_path_trees': 0, 'journal': 0}
+
+        # list rows hold references to int objects, array rows hold raw values
+        seen = set()
+        for row in self.adj_matrix:
+            footprint['rows'] += sys.getsizeof(row)
+            if isinstance(row, list):
+                for weight in row:
+                    if id(weight) not in seen:
+                        seen.add(id(weight))
+                        footprint['weights'] += sys.getsizeof(weight)
+
+        # trees count their lists and each distinct distance / parent object
+        if self.shortest_path_trees:
+            for tree in self.shortest_path_trees:
+                footprint['shortest_path_trees'] += sys.getsizeof(tree)
+                for values in (tree.dist, tree.parent):
+                    footprint['shortest_path_trees'] += sys.getsizeof(values)
+                    for value in values:
+                        if id(value) not in seen:
+                            seen.add(id(value))
+                            footprint['shortest_path_trees'] += sys.getsizeof(value)
+
+        if self.journal is not None:
+            footprint['journal'] = self.journal.memory_footprint()
+
+        footprint['total'] = sum(footprint.values())
+        return footprint
+
     def dijkstra(self, src: int) -> []:
         """
-        TODO: Write this implementation
+        Returns list of shortest distances from src to each vertex
+        Unreachable vertices have a distance of infinity
+        """
+        return list(ShortestPathTree(self, src).dist)
+
+    def k_hop(self, v: int, k: int) -> []:
+        """
+        Returns list of vertex lists, index i holding the vertices i hops from v
+        Vertices in each list are in ascending order
+        """
+        if v < 0 or v >= self.v_count or k < 0:
+            return []
+
+        # expands one level at a time, stopping after k hops
+        k_hop_levels = [[v]]
+        k_hop_visited = {v}
+        while len(k_hop_levels) <= k:
+            next_level = []
+            for vertex in k_hop_levels[-1]:
+                row = self.adj_matrix[vertex]
+                for index in range(len(row)):
+                    if row[index] > 0 and index not in k_hop_visited:
+                        k_hop_visited.add(index)
+                        next_level.append(index)
+            if not next_level:
+                break
+            next_level.sort()
+            k_hop_levels.append(next_level)
+
+        return k_hop_levels
+
+    def subgraph(self, vertices) -> 'DirectedSubgraph':
+        """
+        Returns a read-only view of the subgraph induced by vertices
+        """
+        return DirectedSubgraph(self, vertices)
+
+    def shortest_path_tree(self, src: int) -> 'ShortestPathTree':
+        """
+        Returns a shortest path tree from src that is repaired on every change
+        """
+        tree = ShortestPathTree(self, src)
+        if self.shortest_path_trees is None:
+            self.shortest_path_trees = []
+        self.shortest_path_trees.append(tree)
+        return tree
+
+    def remove_shortest_path_tree(self, tree: 'ShortestPathTree') -> None:
+        """
+        Stops repairing a registered shortest path tree
+        """
+        if self.shortest_path_trees and tree in self.shortest_path_trees:
+            self.shortest_path_trees.remove(tree)
+
+
+class ShortestPathTree:
+    """
+    Class to implement a single source shortest path tree
+    - distances are read in O(1)
+    - edge insertions and weight decreases only touch improved vertices
+    - edge removals and weight increases only re-settle the orphaned subtree
+    """
+
+    __slots__ = ('graph', 'src', 'dist', 'parent')
+
+    def __init__(self, graph: DirectedGraph, src: int):
+        """
+        Builds the tree with a full Dijkstra pass
+        """
+        self.graph = graph
+        self.src = src
+        self.dist = []
+        self.parent = []
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Recomputes every distance from scratch
+        """
+        length = self.graph.v_count
+        self.dist = [float('inf')] * length
+        self.parent = [None] * length
+
+        # checks if src is in the graph
+        if 0 <= self.src < length:
+            self.dist[self.src] = 0
+            self._settle([(0, self.src)])
+
+    def distance(self, v: int) -> float:
+        """
+        Returns shortest distance from the source to v
+        """
+        if 0 <= v < len(self.dist):
+            return self.dist[v]
+        return float('inf')
+
+    def path(self, v: int) -> []:
+        """
+        Returns list of vertices on the shortest path to v, empty if unreachable
+        """
+        if self.distance(v) == float('inf'):
+            return []
+
+        # walks parent links back to the source
+        path_results = []
+        while v is not None:
+            path_results.append(v)
+            v = self.parent[v]
+        path_results.reverse()
+        return path_results
+
+    def vertex_added(self) -> None:
+        """
+        Extends the tree with a new unreachable vertex
+        """
+        self.dist.append(float('inf'))
+        self.parent.append(None)
+
+        # the source may be created after the tree
+        if len(self.dist) - 1 == self.src:
+            self.dist[self.src] = 0
+
+    def edge_updated(self, src: int, dst: int, old_weight, new_weight) -> None:
+        """
+        Repairs the tree after edge src -> dst changed weight (0 means no edge)
+        """
+        # insertion or weight decrease: propagates from dst if it improved
+        if new_weight > 0 and (old_weight == 0 or new_weight < old_weight):
+            candidate = self.dist[src] + new_weight
+            if candidate < self.dist[dst]:
+                self.dist[dst] = candidate
+                self.parent[dst] = src
+                self._settle([(candidate, dst)])
+
+        # removal or weight increase of a tree edge: re-settles dst's subtree
+        elif new_weight != old_weight and self.parent[dst] == src:
+            self._resettle_subtree(dst)
+
+    def _resettle_subtree(self, root: int) -> None:
+        """
+        Re-settles root and all of its descendants in the tree
+        """
+        # builds child lists from the parent links
+        children = {}
+        for vertex in range(len(self.parent)):
+            parent = self.parent[vertex]
+            if parent is not None:
+                children.setdefault(parent, []).append(vertex)
+
+        # collects the orphaned subtree
+        orphans = {root}
+        orphan_stack = [root]
+        while orphan_stack:
+            node_curr = orphan_stack.pop()
+            for child in children.get(node_curr, []):
+                orphans.add(child)
+                orphan_stack.append(child)
+        for vertex in orphans:
+            self.dist[vertex] = float('inf')
+            self.parent[vertex] = None
+
+        # seeds each orphan with its best edge from a settled vertex
+        matrix = self.graph.adj_matrix
+        seeds = []
+        for vertex in orphans:
+            for index in range(len(matrix)):
+                weight = matrix[index][vertex]
+                if weight > 0 and index not in orphans and \
+                        self.dist[index] + weight < self.dist[vertex]:
+                    self.dist[vertex] = self.dist[index] + weight
+                    self.parent[vertex] = index
+            if self.dist[vertex] < float('inf'):
+                seeds.append((self.dist[vertex], vertex))
+
+        self._settle(seeds)
+
+    def _settle(self, heap: []) -> None:
+        """
+        Runs Dijkstra from the seeded (distance, vertex) heap
         """
-        pass
+        heapq.heapify(heap)
+        matrix = self.graph.adj_matrix
+
+        while heap:
+            dist_curr, node_curr = heapq.heappop(heap)
+            # skips stale heap entries
+            if dist_curr > self.dist[node_curr]:
+                continue
+
+            # relaxes outgoing edges
+            row = matrix[node_curr]
+            for index in range(len(row)):
+                weight = row[index]
+                if weight > 0 and dist_curr + weight < self.dist[index]:
+                    self.dist[index] = dist_curr + weight
+                    self.parent[index] = node_curr
+                    heapq.heappush(heap, (dist_curr + weight, index))
+
+
+class _SubgraphRow:
+    """
+    Read-only matrix row of an induced subgraph, indexed by local vertex
+    """
+
+    __slots__ = ('row', 'vertices')
+
+    def __init__(self, row, vertices: []):
+        self.row = row
+        self.vertices = vertices
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    def __getitem__(self, index: int):
+        return self.row[self.vertices[index]]
+
+
+class _SubgraphMatrix:
+    """
+    Read-only adjacency matrix of an induced subgraph, indexed by local vertex
+    Cells are read from the parent graph on each access
+    """
+
+    __slots__ = ('graph', 'vertices')
+
+    def __init__(self, graph: DirectedGraph, vertices: []):
+        self.graph = graph
+        self.vertices = vertices
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    def __getitem__(self, index: int) -> _SubgraphRow:
+        return _SubgraphRow(self.graph.adj_matrix[self.vertices[index]], self.vertices)
+
+
+class _SubgraphGraph:
+    """
+    Read-only stand-in for a DirectedGraph over a view's local vertex numbers
+    Exposes only v_count, adj_matrix and the DirectedGraph methods that read them
+    """
+
+    __slots__ = ('v_count', 'adj_matrix')
+
+    def __init__(self, graph: DirectedGraph, vertices: []):
+        self.v_count = len(vertices)
+        self.adj_matrix = _SubgraphMatrix(graph, vertices)
+
+    # read-only DirectedGraph methods run unchanged against the proxy matrix
+    get_vertices = DirectedGraph.get_vertices
+    get_edges = DirectedGraph.get_edges
+    dfs = DirectedGraph.dfs
+    bfs = DirectedGraph.bfs
+    has_cycle = DirectedGraph.has_cycle
+    dijkstra = DirectedGraph.dijkstra
+
+
+class DirectedSubgraph:
+    """
+    Class to implement a view of the subgraph induced by a set of vertices
+    - nothing is copied, parent edge changes show up in the view
+    - traversals only touch the view's vertices, results use parent vertex names
+    - only the methods below are supported, they run on the private _local
+      adapter, which has no mutating methods
+    """
+
+    def __init__(self, graph: DirectedGraph, vertices):
+        """
+        Stores the parent graph and numbers the view's vertices locally
+        """
+        self.graph = graph
+        self.vertices = sorted({v for v in vertices if 0 <= v < graph.v_count})
+        self.index = {v: i for i, v in enumerate(self.vertices)}
+
+        # read-only graph over local vertex numbers, reading the parent matrix
+        self._local = _SubgraphGraph(graph, self.vertices)
+
+    def get_vertices(self) -> []:
+        """
+        Returns a list of the view's vertices
+        """
+        return list(self.vertices)
+
+    def get_edges(self) -> []:
+        """
+        Returns a list of tuple edges between the view's vertices
+        """
+        return [(self.vertices[src], self.vertices[dst], weight)
+                for src, dst, weight in self._local.get_edges()]
+
+    def dfs(self, v_start, v_end=None) -> []:
+        """
+        Returns list of vertices visited during DFS search inside the view
+        """
+        if v_start not in self.index:
+            return []
+        path = self._local.dfs(self.index[v_start], self.index.get(v_end))
+        return [self.vertices[index] for index in path]
+
+    def bfs(self, v_start, v_end=None) -> []:
+        """
+        Returns list of vertices visited during BFS search inside the view
+        """
+        if v_start not in self.index:
+            return []
+        path = self._local.bfs(self.index[v_start], self.index.get(v_end))
+        return [self.vertices[index] for index in path]
+
+    def has_cycle(self) -> bool:
+        """
+        Returns True if the view contains a cycle, False otherwise
+        """
+        if not self.vertices:
+            return False
+        return self._local.has_cycle()
+
+    def dijkstra(self, src: int) -> dict:
+        """
+        Returns dict of vertex -> shortest distance inside the view from src
+        Keys are parent vertex ids, unreachable vertices have infinity
+        """
+        if src not in self.index:
+            return {v: float('inf') for v in self.vertices}
+        distances = self._local.dijkstra(self.index[src])
+        return {self.vertices[index]: distances[index] for index in range(len(distances))}
 
 
 if __name__ == '__main__':
@@ -353,3 +778,25 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+    print("\nshortest_path_tree() example 1")
+    print("------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    tree = g.shortest_path_tree(0)
+    print(tree.dist, tree.path(2))
+    g.remove_edge(4, 3)
+    print(tree.dist, tree.path(2))
+    g.add_edge(1, 2, 4)
+    print(tree.dist, tree.path(2))
+
+    print("\nmethod k_hop() / subgraph() example 1")
+    print("-------------------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    levels = g.k_hop(1, 2)
+    print(levels)
+    view = g.subgraph([v for level in levels for v in level])
+    print(view.get_edges(), view.dfs(1), view.has_cycle(), view.dijkstra(1), sep='\n')
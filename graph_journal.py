@@ -0,0 +1,409 @@
+# Course: CS 261
+# Author: Jeremy Vernon
+# Assignment: 6
+# Description: Write-ahead journal for Undirected and Directed Graphs
+
+import atexit
+import io
+import os
+import sys
+import struct
+import tempfile
+
+from d_graph import DirectedGraph
+from ud_graph import UndirectedGraph
+
+# file header: graph kind magic followed by the checkpoint generation
+UNDIRECTED_MAGIC = b'UGJ1'
+DIRECTED_MAGIC = b'DGJ1'
+HEADER = struct.Struct('<4sQ')
+
+# record op codes
+OP_CODES = {'add_vertex': 1, 'add_edge': 2, 'remove_edge': 3, 'remove_vertex': 4}
+OP_NAMES = {code: name for name, code in OP_CODES.items()}
+
+# directed graph record payloads, keyed by op code
+DIRECTED_PAYLOADS = {1: struct.Struct('<'), 2: struct.Struct('<iid'), 3: struct.Struct('<ii')}
+STRING_LENGTH = struct.Struct('<I')
+
+# real paths of journals open for appending in this process
+_open_paths = set()
+
+
+class JournalError(Exception):
+    """
+    Raised when a journal or checkpoint file cannot be read
+    """
+    pass
+
+
+class GraphJournal:
+    """
+    Class to implement an append-only mutation journal
+    - each record is written to the file as it arrives, so a process crash
+      loses nothing; fsync runs once per batch, so power loss can drop at
+      most sync_every - 1 records
+    - compact() folds the journal into a fresh checkpoint
+    - checkpoint lives at path + '.ckpt', the journal at path
+    - closed on interpreter exit, or use it as a context manager
+    - only one journal in the process may append to a path at a time
+    """
+
+    __slots__ = ('graph', 'path', 'generation', 'sync_every', 'magic',
+                 'pending_count', 'file')
+
+    def __init__(self, graph, path: str, generation: int, sync_every=64):
+        """
+        Opens the journal for appending, use attach() or recover() instead
+        """
+        _check_not_open(path)
+        self.graph = graph
+        self.path = path
+        self.generation = generation
+        self.sync_every = sync_every
+        self.magic = _magic_for(graph)
+        self.pending_count = 0
+        self.file = open(path, 'ab')
+        _open_paths.add(os.path.realpath(path))
+        graph.journal = self
+        atexit.register(self.close)
+
+    def __enter__(self) -> 'GraphJournal':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def record(self, name: str, *args) -> None:
+        """
+        Appends one mutation, fsyncing once the batch is full
+        """
+        self.file.write(_encode(self.magic, OP_CODES[name], args))
+        self.file.flush()
+        self.pending_count += 1
+        if self.pending_count >= self.sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        """
+        Fsyncs the records written since the last sync
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending_count = 0
+
+    def memory_footprint(self) -> int:
+        """
+        Returns approximate bytes held in memory by the journal
+        """
+        footprint = sys.getsizeof(self) + sys.getsizeof(self.path) + sys.getsizeof(self.file)
+        if not self.file.closed:
+            footprint += io.DEFAULT_BUFFER_SIZE
+        return footprint
+
+    def compact(self) -> None:
+        """
+        Writes a fresh checkpoint of the graph and starts an empty journal
+        """
+        self.sync()
+        self.file.close()
+
+        # the new generation makes a crash between the two steps safe:
+        # an old journal no longer matches the checkpoint and is ignored
+        self.generation += 1
+        _write_atomic(self.path + '.ckpt', self.magic, self.generation, _snapshot(self.graph, self.magic))
+        _write_atomic(self.path, self.magic, self.generation, b'')
+        self.file = open(self.path, 'ab')
+
+    def close(self) -> None:
+        """
+        Syncs and detaches the journal from its graph, safe to call twice
+        """
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+            _open_paths.discard(os.path.realpath(self.path))
+        if self.graph.journal is self:
+            self.graph.journal = None
+        atexit.unregister(self.close)
+
+
+def attach(graph, path: str, sync_every=64, overwrite=False) -> GraphJournal:
+    """
+    Starts journaling graph at path from a checkpoint of its current state
+    Refuses to replace existing journal files unless overwrite is True
+    """
+    magic = _magic_for(graph)
+    if graph.journal is not None:
+        raise JournalError('graph already has a journal, close() it first')
+    _check_not_open(path)
+
+    # starts above any generation already on disk, so a crash before the
+    # journal is reset cannot replay an old journal onto the new checkpoint
+    generation = 0
+    for existing in (path, path + '.ckpt'):
+        if os.path.exists(existing):
+            if not overwrite:
+                raise FileExistsError(existing)
+            try:
+                with open(existing, 'rb') as existing_file:
+                    _, old_generation, _ = _read_header(existing_file.read(HEADER.size))
+                generation = max(generation, old_generation + 1)
+            except JournalError:
+                pass
+
+    _write_atomic(path + '.ckpt', magic, generation, _snapshot(graph, magic))
+    _write_atomic(path, magic, generation, b'')
+    return GraphJournal(graph, path, generation, sync_every)
+
+
+def recover(path: str, sync_every=64):
+    """
+    Rebuilds a graph from its checkpoint and journal tail
+    Returns the graph with a journal attached
+    """
+    _check_not_open(path)
+
+    # loads the checkpoint
+    with open(path + '.ckpt', 'rb') as ckpt_file:
+        magic, generation, body = _read_header(ckpt_file.read())
+    graph = UndirectedGraph() if magic == UNDIRECTED_MAGIC else DirectedGraph()
+    records, good_length = _decode(magic, body)
+    if good_length < len(body):
+        raise JournalError('checkpoint is truncated')
+    _load_snapshot(graph, magic, records)
+
+    # replays the journal tail if it belongs to this checkpoint
+    try:
+        with open(path, 'rb') as journal_file:
+            data = journal_file.read()
+    except FileNotFoundError:
+        data = b''
+    journal_magic, journal_generation, body = _read_header(data) if data else (magic, -1, b'')
+    if journal_magic != magic:
+        raise JournalError('journal and checkpoint hold different graph kinds')
+
+    if journal_generation == generation:
+        records, good_length = _decode(magic, body)
+        _replay(graph, records)
+        # drops a torn record left by a crash mid-write
+        if good_length < len(body):
+            with open(path, 'r+b') as journal_file:
+                journal_file.truncate(HEADER.size + good_length)
+    else:
+        _write_atomic(path, magic, generation, b'')
+
+    GraphJournal(graph, path, generation, sync_every)
+    return graph
+
+
+def _check_not_open(path: str) -> None:
+    """
+    Raises JournalError if a journal in this process is appending to path
+    """
+    if os.path.realpath(path) in _open_paths:
+        raise JournalError(f'{path} is already open, close() its journal first')
+
+
+def _magic_for(graph) -> bytes:
+    """
+    Returns the file magic for the graph's kind
+    """
+    if isinstance(graph, UndirectedGraph):
+        return UNDIRECTED_MAGIC
+    if isinstance(graph, DirectedGraph):
+        return DIRECTED_MAGIC
+    raise TypeError('journal needs an UndirectedGraph or DirectedGraph')
+
+
+def _encode(magic: bytes, op: int, args: ()) -> bytes:
+    """
+    Returns one binary record
+    """
+    if magic == DIRECTED_MAGIC:
+        if op == 2:
+            args = (args[0], args[1], float(args[2]))
+        return bytes([op]) + DIRECTED_PAYLOADS[op].pack(*args)
+
+    # undirected records hold length prefixed utf-8 vertex names
+    out = bytearray([op])
+    for arg in args:
+        name = str(arg).encode('utf-8')
+        out += STRING_LENGTH.pack(len(name)) + name
+    return bytes(out)
+
+
+def _decode(magic: bytes, data: bytes) -> ():
+    """
+    Returns (list of (op name, args), length of the complete records)
+    Stops at the first incomplete record
+    """
+    records = []
+    offset = 0
+    length = len(data)
+    while offset < length:
+        start = offset
+        op = data[offset]
+        offset += 1
+        if op not in OP_NAMES:
+            raise JournalError(f'unknown op code {op} at offset {start}')
+
+        if magic == DIRECTED_MAGIC:
+            payload = DIRECTED_PAYLOADS.get(op)
+            if payload is None:
+                raise JournalError(f'unknown op code {op} at offset {start}')
+            if offset + payload.size > length:
+                return records, start
+            args = payload.unpack_from(data, offset)
+            offset += payload.size
+            if op == 2 and args[2].is_integer():
+                args = (args[0], args[1], int(args[2]))
+        else:
+            args = []
+            for _ in range(1 if op in (1, 4) else 2):
+                if offset + STRING_LENGTH.size > length:
+                    return records, start
+                (name_length,) = STRING_LENGTH.unpack_from(data, offset)
+                offset += STRING_LENGTH.size
+                if offset + name_length > length:
+                    return records, start
+                args.append(data[offset:offset + name_length].decode('utf-8'))
+                offset += name_length
+
+        records.append((OP_NAMES[op], tuple(args)))
+
+    return records, offset
+
+
+def _replay(graph, records: []) -> None:
+    """
+    Applies decoded records to graph
+    """
+    for name, args in records:
+        getattr(graph, name)(*args)
+
+
+def _load_snapshot(graph, magic: bytes, records: []) -> None:
+    """
+    Builds an empty graph's storage straight from checkpoint records
+    Checkpoints hold each vertex and edge once, so no duplicate checks are needed
+    """
+    for name, _ in records:
+        if name not in ('add_vertex', 'add_edge'):
+            raise JournalError(f'unexpected {name} record in checkpoint')
+
+    if magic == DIRECTED_MAGIC:
+        v_count = sum(1 for name, _ in records if name == 'add_vertex')
+        graph.v_count = v_count
+        graph.adj_matrix = [[0] * v_count for _ in range(v_count)]
+        for name, args in records:
+            if name == 'add_edge':
+                src, dst, weight = args
+                graph.adj_matrix[src][dst] = weight
+    else:
+        for name, args in records:
+            if name == 'add_vertex':
+                graph.adj_list[args[0]] = []
+            else:
+                u, v = args
+                graph.adj_list[u].append(v)
+                graph.adj_list[v].append(u)
+
+
+def _snapshot(graph, magic: bytes) -> bytes:
+    """
+    Returns records that rebuild graph from empty
+    """
+    out = bytearray()
+    if magic == DIRECTED_MAGIC:
+        for _ in range(graph.v_count):
+            out += _encode(magic, 1, ())
+        for src, dst, weight in graph.get_edges():
+            out += _encode(magic, 2, (src, dst, weight))
+    else:
+        for vertex in graph.adj_list:
+            out += _encode(magic, 1, (vertex,))
+        # each edge once, from the first of its endpoints
+        seen = set()
+        for u in graph.adj_list:
+            seen.add(u)
+            for v in graph.adj_list[u]:
+                if v not in seen:
+                    out += _encode(magic, 2, (u, v))
+    return bytes(out)
+
+
+def _read_header(data: bytes) -> ():
+    """
+    Returns (magic, generation, body) of a journal or checkpoint file
+    """
+    if len(data) < HEADER.size:
+        raise JournalError('file is too short for a header')
+    magic, generation = HEADER.unpack_from(data)
+    if magic not in (UNDIRECTED_MAGIC, DIRECTED_MAGIC):
+        raise JournalError('file is not a graph journal')
+    return magic, generation, data[HEADER.size:]
+
+
+def _write_atomic(path: str, magic: bytes, generation: int, body: bytes) -> None:
+    """
+    Replaces path with header + body, fsynced before the rename
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(HEADER.pack(magic, generation))
+        tmp_file.write(body)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+
+    print("\nattach() / recover() example 1")
+    print("------------------------------")
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'ud.journal')
+    g = UndirectedGraph(['AB', 'AC', 'BC'])
+    journal = attach(g, path, sync_every=4)
+    g.add_edge('C', 'D')
+    g.remove_vertex('A')
+    # every record reaches the file before the graph changes
+    print(os.path.getsize(path))
+    journal.close()
+    r = recover(path)
+    print(g, r, sep='\n')
+    r.journal.close()
+
+    print("\nattach() overwrite example 1")
+    print("----------------------------")
+    g = UndirectedGraph(['XY'])
+    with attach(g, path, overwrite=True) as journal:
+        print(journal.generation)
+
+    print("\ntorn record example 1")
+    print("---------------------")
+    path = os.path.join(folder, 'd.journal')
+    g = DirectedGraph([(0, 1, 10), (1, 2, 5)])
+    with attach(g, path) as journal:
+        g.add_vertex()
+        g.add_edge(2, 3, 7)
+    # half of an add_edge record, as left by a crash mid-write
+    with open(path, 'ab') as journal_file:
+        journal_file.write(_encode(DIRECTED_MAGIC, 2, (3, 0, 1))[:5])
+    h = recover(path)
+    print(h.get_edges(), os.path.getsize(path))
+    h.journal.close()
+
+    print("\ncompact() crash example 1")
+    print("-------------------------")
+    h = recover(path)
+    h.add_vertex()
+    h.add_edge(4, 0, 2)
+    # crash after the new checkpoint is written but before the journal is reset
+    h.journal.sync()
+    _write_atomic(path + '.ckpt', DIRECTED_MAGIC, h.journal.generation + 1, _snapshot(h, DIRECTED_MAGIC))
+    h.journal.close()
+    r = recover(path)
+    print(r.v_count, r.get_edges())
+    r.journal.close()
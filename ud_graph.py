@@ -4,7 +4,104 @@
 # Description: Undirected Graphs
 
 import heapq
+import os
+import pickle
+import sys
+import zlib
 from collections import deque
+from multiprocessing import Pipe, Process
+
+
+def _find(parent: dict, v):
+    """
+    Returns root of v in a union-find parent map, halving the path as it goes
+    """
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+
+def _union(parent: dict, u, v) -> bool:
+    """
+    Merges the sets containing u and v, returns True if they were separate
+    """
+    u_root = _find(parent, u)
+    v_root = _find(parent, v)
+    if u_root == v_root:
+        return False
+    parent[v_root] = u_root
+    return True
+
+
+def _shard_of(v, shard_count: int) -> int:
+    """
+    Returns the shard owning v, computable in any process without a lookup
+    """
+    return zlib.crc32(str(v).encode('utf-8')) % shard_count
+
+
+def _shard_local(shard_adj: dict, shard_index: int, shard_count: int) -> ():
+    """
+    Finds components inside one shard of the adjacency list
+    Returns (vertex -> root id, list indexed by shard of the distinct
+    (root id, foreign vertex) pairs whose foreign vertex that shard owns)
+    Root ids are integers unique across shards, which hash faster than names
+    Each edge leaving the shard is reported only from its smaller endpoint,
+    so the other shard does not report it again
+    """
+    parent = {v: v for v in shard_adj}
+    crossing = []
+    for v in shard_adj:
+        for u in shard_adj[v]:
+            if u in parent:
+                _union(parent, v, u)
+            elif v < u:
+                crossing.append((v, u))
+
+    # numbers the local roots, local index * shard_count + shard_index
+    root_ids = {}
+    roots = {}
+    for v in parent:
+        root = _find(parent, v)
+        if root not in root_ids:
+            root_ids[root] = len(root_ids) * shard_count + shard_index
+        roots[v] = root_ids[root]
+
+    # collapses edges leaving the same local component for the same vertex
+    outgoing = [set() for _ in range(shard_count)]
+    for v, u in crossing:
+        outgoing[_shard_of(u, shard_count)].add((roots[v], u))
+    outgoing[shard_index] = set()
+    return roots, [list(pairs) for pairs in outgoing]
+
+
+def _shard_resolve(roots: dict, incoming: []) -> []:
+    """
+    Returns the distinct (foreign root, local root) pairs for the
+    (foreign root, local vertex) pairs other shards sent to this shard
+    """
+    resolved = set()
+    for pairs in incoming:
+        for foreign_root, v in pairs:
+            resolved.add((foreign_root, roots[v]))
+    return list(resolved)
+
+
+def _shard_worker(conn, shard_adj: dict, shard_index: int, shard_count: int, labels: bool) -> None:
+    """
+    Worker process entry point
+    Sends its outgoing pairs to the parent pickled per destination shard,
+    so the parent can forward them without unpickling, then resolves the
+    pairs it receives and sends back (local root count, root pairs, labels)
+    """
+    roots, outgoing = _shard_local(shard_adj, shard_index, shard_count)
+    conn.send([pickle.dumps(pairs, pickle.HIGHEST_PROTOCOL) for pairs in outgoing])
+    incoming = [pickle.loads(blob) for blob in conn.recv()]
+    root_count = len(set(roots.values()))
+    conn.send((root_count, _shard_resolve(roots, incoming), roots if labels else None))
+    conn.close()
+
 
 class UndirectedGraph:
     """
@@ -15,6 +112,12 @@ class UndirectedGraph:
     - vertex names are strings
     """
 
+    # optional graph_journal.GraphJournal recording every mutation
+    journal = None
+
+    # True once compact() is called, new vertex names are then interned
+    compact_names = False
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
@@ -46,7 +149,12 @@ class UndirectedGraph:
         """
         Adds new vertex to the graph
         """
+        if self.compact_names:
+            v = sys.intern(v)
         if v not in self.adj_list:
+            # logs the change before making it
+            if self.journal is not None:
+                self.journal.record('add_vertex', v)
             self.adj_list[v] = []
 
 
@@ -54,11 +162,20 @@ class UndirectedGraph:
         """
         Adds edge to the graph
         """
+        if self.compact_names:
+            u = sys.intern(u)
+            v = sys.intern(v)
+
         # adds vertices if not already in graph
-        if u is not v:
+        if u != v:
             self.add_vertex(u)
             self.add_vertex(v)
 
+            # logs the change before making it
+            if self.journal is not None and \
+                    (v not in self.adj_list[u] or u not in self.adj_list[v]):
+                self.journal.record('add_edge', u, v)
+
             # adds edge
             if v not in self.adj_list[u]:
                 self.adj_list[u].append(v)
@@ -73,6 +190,11 @@ class UndirectedGraph:
         # checks if u and v are in the graph
         if u in self.adj_list and v in self.adj_list:
 
+            # logs the change before making it
+            if self.journal is not None and \
+                    (v in self.adj_list[u] or u in self.adj_list[v]):
+                self.journal.record('remove_edge', v, u)
+
             # removes reference to the other vertex
             if v in self.adj_list[u]:
                 self.adj_list[u].remove(v)
@@ -86,6 +208,9 @@ class UndirectedGraph:
         """
         # removes key if it exists
         if v in self.adj_list:
+            # logs the change before making it
+            if self.journal is not None:
+                self.journal.record('remove_vertex', v)
             del self.adj_list[v]
 
         # adjusts remaining edges
@@ -94,6 +219,40 @@ class UndirectedGraph:
                 self.adj_list[key].remove(v)
 
 
+    def compact(self) -> None:
+        """
+        Interns vertex names and trims spare capacity from the neighbor lists
+        Names added later are interned too, trimming only happens in this call
+        """
+        self.compact_names = True
+        compact_list = dict()
+        for key in self.adj_list:
+            # list() of a tuple allocates exactly len() slots
+            compact_list[sys.intern(key)] = list(tuple(sys.intern(value) for value in self.adj_list[key]))
+        self.adj_list = compact_list
+
+    def memory_footprint(self) -> dict:
+        """
+        Returns approximate bytes used by each part of the graph
+        """
+        footprint = {'index': sys.getsizeof(self.adj_list), 'neighbor_lists': 0,
+                     'names': 0, 'journal': 0}
+
+        # counts each distinct name object once
+        seen = set()
+        for key in self.adj_list:
+            footprint['neighbor_lists'] += sys.getsizeof(self.adj_list[key])
+            for name in [key] + self.adj_list[key]:
+                if id(name) not in seen:
+                    seen.add(id(name))
+                    footprint['names'] += sys.getsizeof(name)
+
+        if self.journal is not None:
+            footprint['journal'] = self.journal.memory_footprint()
+
+        footprint['total'] = sum(footprint.values())
+        return footprint
+
     def get_vertices(self) -> []:
         """
         Return list of vertices in the graph (any order)
@@ -221,6 +380,37 @@ class UndirectedGraph:
 
         return bfs_reachable_vertices
 
+    def k_hop(self, v, k: int) -> []:
+        """
+        Returns list of vertex lists, index i holding the vertices i hops from v
+        Vertices in each list are in ascending order
+        """
+        if v not in self.adj_list or k < 0:
+            return []
+
+        # expands one level at a time, stopping after k hops
+        k_hop_levels = [[v]]
+        k_hop_visited = {v}
+        while len(k_hop_levels) <= k:
+            next_level = []
+            for vertex in k_hop_levels[-1]:
+                for value in self.adj_list[vertex]:
+                    if value not in k_hop_visited:
+                        k_hop_visited.add(value)
+                        next_level.append(value)
+            if not next_level:
+                break
+            next_level.sort()
+            k_hop_levels.append(next_level)
+
+        return k_hop_levels
+
+    def subgraph(self, vertices) -> 'UndirectedSubgraph':
+        """
+        Returns a read-only view of the subgraph induced by vertices
+        """
+        return UndirectedSubgraph(self, vertices)
+
     def count_connected_components(self):
         """
         Return number of connected componets in the graph
@@ -238,6 +428,82 @@ class UndirectedGraph:
 
         return count
 
+    def count_connected_components_sharded(self, workers=None, labels=False):
+        """
+        Return number of connected components using worker processes
+        Vertices are hashed into shards and each shard is solved with
+        union-find; shards then resolve the edges between them to pairs of
+        local roots, so the parent only merges roots
+        If labels is True, returns (count, dict of vertex -> component number)
+        """
+        # initializes
+        vertices = self.get_vertices()
+        if workers is None:
+            workers = os.cpu_count() or 1
+        shard_count = max(1, min(workers, len(vertices)))
+
+        # splits the adjacency list into shards by vertex hash
+        shards = [dict() for _ in range(shard_count)]
+        for v in vertices:
+            shards[_shard_of(v, shard_count)][v] = self.adj_list[v]
+
+        # solves a single shard in this process
+        if shard_count == 1:
+            roots, _ = _shard_local(shards[0], 0, 1)
+            results = [(len(set(roots.values())), [], roots)]
+        else:
+            results = None
+            pipes = []
+            processes = []
+            try:
+                for index in range(shard_count):
+                    parent_conn, child_conn = Pipe()
+                    process = Process(target=_shard_worker,
+                                      args=(child_conn, shards[index], index, shard_count, labels))
+                    process.start()
+                    child_conn.close()
+                    pipes.append(parent_conn)
+                    processes.append(process)
+
+                # forwards each shard's pairs to the shards owning the foreign vertices
+                outgoing = [conn.recv() for conn in pipes]
+                for index in range(shard_count):
+                    pipes[index].send([blobs[index] for blobs in outgoing])
+                results = [conn.recv() for conn in pipes]
+            finally:
+                # stops the remaining workers if one of them failed
+                for process in processes:
+                    if results is None:
+                        process.terminate()
+                    process.join()
+
+        # merges root ids, every successful union joins two components
+        count = 0
+        parent = {}
+        for root_count, root_pairs, _ in results:
+            count += root_count
+            for u_root, v_root in root_pairs:
+                parent.setdefault(u_root, u_root)
+                parent.setdefault(v_root, v_root)
+                if _union(parent, u_root, v_root):
+                    count -= 1
+
+        if not labels:
+            return count
+
+        # numbers the components 0 to count - 1
+        components = {}
+        component_labels = {}
+        for _, _, roots in results:
+            for v in roots:
+                root = roots[v]
+                if root in parent:
+                    root = _find(parent, root)
+                if root not in components:
+                    components[root] = len(components)
+                component_labels[v] = components[root]
+        return count, {v: component_labels[v] for v in vertices}
+
     def has_cycle(self):
         """
         Returns True if graph contains a cycle, False otherwise
@@ -294,6 +560,69 @@ class UndirectedGraph:
    
 
 
+class _SubgraphAdjacency:
+    """
+    Read-only adjacency list of an induced subgraph
+    Neighbor lists are filtered from the parent graph on each access
+    """
+
+    __slots__ = ('graph', 'vertices')
+
+    def __init__(self, graph: UndirectedGraph, vertices: dict):
+        self.graph = graph
+        self.vertices = vertices
+
+    def __contains__(self, v) -> bool:
+        return v in self.vertices and v in self.graph.adj_list
+
+    def __iter__(self):
+        for v in self.vertices:
+            if v in self.graph.adj_list:
+                yield v
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __getitem__(self, v) -> []:
+        if v not in self.vertices:
+            raise KeyError(v)
+        return [value for value in self.graph.adj_list[v] if value in self.vertices]
+
+
+class UndirectedSubgraph:
+    """
+    Class to implement a view of the subgraph induced by a set of vertices
+    - nothing is copied, parent changes show up in the view
+    - traversals only touch the view's vertices and their edges
+    """
+
+    def __init__(self, graph: UndirectedGraph, vertices):
+        """
+        Stores the parent graph and the view's vertex set
+        """
+        self.graph = graph
+        # dict keeps the given order and gives O(1) membership
+        self.adj_list = _SubgraphAdjacency(graph, dict.fromkeys(vertices))
+
+    # read-only UndirectedGraph methods run unchanged against the filtered adjacency
+    __str__ = UndirectedGraph.__str__
+    get_vertices = UndirectedGraph.get_vertices
+    get_edges = UndirectedGraph.get_edges
+    is_valid_path = UndirectedGraph.is_valid_path
+    dfs = UndirectedGraph.dfs
+    bfs = UndirectedGraph.bfs
+    k_hop = UndirectedGraph.k_hop
+    count_connected_components = UndirectedGraph.count_connected_components
+
+    def has_cycle(self) -> bool:
+        """
+        Returns True if the view contains a cycle, False otherwise
+        """
+        if not self.adj_list:
+            return False
+        return UndirectedGraph.has_cycle(self)
+
+
 if __name__ == '__main__':
 
     print("\nPDF - method add_vertex() / add_edge example 1")
@@ -380,6 +709,12 @@ if __name__ == '__main__':
         print(g.count_connected_components(), end=' ')
     print()
 
+    print("\nmethod count_connected_components_sharded() example 1")
+    print("-----------------------------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    print(g.count_connected_components_sharded(workers=3, labels=True))
+
 
     print("\nPDF - method has_cycle() example 1")
     print("----------------------------------")
@@ -396,3 +731,12 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+    print("\nmethod k_hop() / subgraph() example 1")
+    print("-------------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    levels = g.k_hop('H', 2)
+    print(levels)
+    view = g.subgraph([v for level in levels for v in level])
+    print(view, view.get_edges(), view.bfs('H'), view.has_cycle(), sep='\n')